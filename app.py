@@ -1,31 +1,58 @@
 
 import os
+import re
+import hashlib
+import importlib.metadata
 import logging
-from flask import Flask, render_template, request, redirect, url_for, send_file, flash, session
+import shutil
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from flask import Flask, render_template, request, redirect, url_for, send_file, flash, session, jsonify
 from werkzeug.utils import secure_filename
 import data_analyzer  # Import the analysis logic
-import json
+import orjson
+import pandas as pd
+
+UPLOAD_BUFFER_SIZE = 1024 * 1024
+RESULTS_CACHE_VERSION = 1  # Bump whenever a change to the analysis alters its results
+RESULTS_CACHE_MAX_ENTRIES = 32  # Cached result sets kept; least recently used are evicted first
+# Saved per analysis; the JSON sidecar is written last and marks the results as complete
+RESULT_FILES = ("relationships.feather", "intermediate_results.json")
 
 app = Flask(__name__)
 app.secret_key = 'supersecretkey'  # Change this for production
 app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), 'uploads')
 app.config['Result_FOLDER'] = os.path.join(os.getcwd(), 'results')
+app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 ** 3  # Reject uploads larger than 2 GB
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['Result_FOLDER'], exist_ok=True)
 
+# Background analysis jobs (job_id -> Future while running, error message once failed). Keeps long
+# analyses off the request worker. Only job state lives here: results go to the session folder,
+# and successful jobs are dropped as soon as they finish; failed ones once their error has been shown.
+ANALYSIS_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+JOBS = {}
+
 # Configure logging for the Flask app
 logging.basicConfig(level=logging.DEBUG)
 
-def params_to_list(files):
-    # Depending on how the form sends data, files might be a list or logic needed
-    pass
-
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/reset')
 def reset():
+    session_id = session.get('session_id')
+    if session_id:
+        # Remove the uploaded files of this session; a job already running can't be cancelled
+        # and still reads and writes them, so its folder goes once it has finished
+        session_folder = os.path.join(app.config['UPLOAD_FOLDER'], session_id)
+        job = JOBS.pop(session_id, None)
+        if isinstance(job, Future) and not job.cancel():
+            job.add_done_callback(lambda _: shutil.rmtree(session_folder, ignore_errors=True))
+        else:
+            shutil.rmtree(session_folder, ignore_errors=True)
     session.clear()
     return redirect(url_for('index'))
 
@@ -40,13 +67,9 @@ def analyze():
         flash('No selected file')
         return redirect(request.url)
 
-    import uuid
-    import shutil
-    
     # Create a unique session ID for this request
-    session_id = str(uuid.uuid4())
-    session_folder = os.path.join(app.config['UPLOAD_FOLDER'], session_id)
-    os.makedirs(session_folder, exist_ok=True)
+    session_folder = tempfile.mkdtemp(dir=app.config['UPLOAD_FOLDER'])
+    session_id = os.path.basename(session_folder)
 
     # Store session_id in user session
     session['session_id'] = session_id
@@ -65,7 +88,9 @@ def analyze():
 
             filename = secure_filename(file.filename)
             filepath = os.path.join(session_folder, filename)
-            file.save(filepath)
+            # Stream to disk with a 1 MB buffer (far fewer syscalls than the default chunking)
+            with open(filepath, 'wb') as out:
+                shutil.copyfileobj(file.stream, out, length=UPLOAD_BUFFER_SIZE)
             saved_files.append(filepath)
 
         if not saved_files:
@@ -77,53 +102,213 @@ def analyze():
         raise e
 
 
-    try:
-        # Load Data
-        dfs = data_analyzer.load_data(saved_files)
-        
-        # Analyze
-        table_pks, relationships = data_analyzer.analyze_relationships(dfs)
-        
-        # Date Columns
-        date_info = []
-        for name, df in dfs.items():
-            d_cols = data_analyzer.detect_date_columns(df)
-            date_info.append({
-                "File Name": name,
-                "Date Columns": ", ".join(d_cols) if d_cols else "None"
-            })
-
-
-
-        # Save Intermediate Results
-        intermediate_data = {
-            "relationships": relationships,
-            "table_pks": table_pks,
-            "date_info": date_info,
+    # Hand the CPU-heavy work to the background pool so this worker can serve other requests
+    future = ANALYSIS_EXECUTOR.submit(run_analysis, saved_files, session_folder)
+    JOBS[session_id] = future
+    future.add_done_callback(partial(finish_job, session_id))
 
-        }
-        
-        intermediate_file = os.path.join(session_folder, "intermediate_results.json")
-        with open(intermediate_file, 'w') as f:
-            json.dump(intermediate_data, f)
-
-        # Prepare data for template
-        # Convert PKS to list of dicts for easy iteration
-        pk_display = [{"Table": k, "Keys": ", ".join(v)} for k, v in table_pks.items()]
-        
-        
-        return render_template('index.html', 
-                               analysis_done=True,
-                               relationships=relationships, 
-                               primary_keys=pk_display, 
-                               date_columns=date_info)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'task_id': session_id}), 202
+    return redirect(url_for('results', job_id=session_id))
 
+def finish_job(job_id, future):
+    """
+    Done-callback: forgets a successful job, its results are on disk from now on. A failed
+    job keeps only its error message, so the traceback doesn't pin the job's tables.
+    """
+    if JOBS.get(job_id) is not future:
+        return  # Reset meanwhile
+    error = future.exception()
+    if error is None:
+        JOBS.pop(job_id, None)
+    else:
+        logging.error(f"Analysis failed: {error}", exc_info=error)
+        JOBS[job_id] = str(error)
 
-    except Exception as e:
-        logging.error(f"Analysis failed: {e}", exc_info=True)
-        flash(f"An error occurred during analysis: {str(e)}")
+def job_state(job_id):
+    """
+    Returns (state, error) of a job: PENDING, FAILURE, SUCCESS (results saved in the
+    session folder) or UNKNOWN.
+    """
+    job = JOBS.get(job_id)
+    if isinstance(job, str):
+        return 'FAILURE', job
+    if job is not None:
+        if not job.done():
+            return 'PENDING', None
+        if job.exception() is not None:  # Done-callback not run yet
+            return 'FAILURE', str(job.exception())
+    if os.path.isfile(os.path.join(app.config['UPLOAD_FOLDER'], job_id, RESULT_FILES[-1])):
+        return 'SUCCESS', None
+    return 'UNKNOWN', None
+
+@app.route('/status/<job_id>')
+def status(job_id):
+    if session.get('session_id') != job_id:
+        return jsonify({'state': 'UNKNOWN'}), 404
+    state, error = job_state(job_id)
+    if state == 'UNKNOWN':
+        return jsonify({'state': state}), 404
+    if state == 'FAILURE':
+        return jsonify({'state': state, 'error': error})
+    return jsonify({'state': state})
+
+@app.route('/results/<job_id>')
+def results(job_id):
+    state, error = job_state(job_id) if session.get('session_id') == job_id else ('UNKNOWN', None)
+    if state == 'UNKNOWN':
+        flash("Analysis not found. Please upload your files again.")
+        return redirect(url_for('index'))
+
+    if state == 'PENDING':
+        return render_template('index.html', job_pending=True, job_id=job_id)
+
+    if state == 'FAILURE':
+        JOBS.pop(job_id, None)  # Reported now, nothing left to keep
+        flash(f"An error occurred during analysis: {error}")
         return redirect(url_for('index'))
-    # finally block removed as cleanup logic depends on whether we want to keep files for re-analysis or not
+
+    table_pks, relationships, date_info = load_results(os.path.join(app.config['UPLOAD_FOLDER'], job_id))
+
+    # Prepare data for template
+    # Convert PKS to list of dicts for easy iteration
+    pk_display = [{"Table": k, "Keys": ", ".join(v)} for k, v in table_pks.items()]
+
+    return render_template('index.html', analysis_done=True,
+                           relationships=relationships.to_dict(orient='records'),
+                           primary_keys=pk_display,
+                           date_columns=date_info)
+
+def _analyzer_digest():
+    """
+    Hash of the analyzer source and of the libraries doing the parsing, so results are never
+    reused across code changes or upgrades (python-calamine also changes the Excel engine).
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(data_analyzer.__file__, 'rb') as f:
+        digest.update(f.read())
+    for package in ("pandas", "numpy", "pyarrow", "python-calamine"):
+        try:
+            version = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            version = None
+        digest.update(f"{package}={version}".encode('utf-8') + b'\0')
+    return digest.digest()
+
+ANALYZER_DIGEST = _analyzer_digest()
+
+def _config_default(value):
+    """orjson fallback for the analyzer constants that are not plain JSON."""
+    if isinstance(value, re.Pattern):
+        return [value.pattern, value.flags]
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Cannot key on {type(value).__name__}")
+
+def fingerprint_files(paths):
+    """
+    Content hash (blake2b) of an upload set, used as the results cache key.
+    File names are included since they become the table names in the report; the cache
+    version, analyzer digest and current analyzer constants are mixed in so stale results never match.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"v{RESULTS_CACHE_VERSION}".encode('utf-8') + b'\0')
+    digest.update(ANALYZER_DIGEST)
+    digest.update(orjson.dumps(data_analyzer.config_snapshot(), default=_config_default,
+                               option=orjson.OPT_SORT_KEYS) + b'\0')
+    for path in sorted(paths, key=os.path.basename):
+        digest.update(os.path.basename(path).encode('utf-8') + b'\0')
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(UPLOAD_BUFFER_SIZE), b''):
+                digest.update(block)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def save_results(folder, table_pks, relationships, date_info):
+    # The relationships frame can grow to T^2*C rows, so it is stored columnar (Feather);
+    # only the small summaries go into the JSON sidecar.
+    relationships.to_feather(os.path.join(folder, "relationships.feather"))
+
+    intermediate_data = {
+        "table_pks": table_pks,
+        "date_info": date_info,
+    }
+    
+    intermediate_file = os.path.join(folder, "intermediate_results.json")
+    with open(intermediate_file, 'wb') as f:
+        f.write(orjson.dumps(intermediate_data, option=orjson.OPT_SERIALIZE_NUMPY))
+
+def load_results(folder):
+    relationships = pd.read_feather(os.path.join(folder, "relationships.feather"))
+    with open(os.path.join(folder, "intermediate_results.json"), 'rb') as f:
+        intermediate_data = orjson.loads(f.read())
+    return intermediate_data["table_pks"], relationships, intermediate_data["date_info"]
+
+def cache_results(source_folder, cache_folder):
+    """
+    Copies saved results into the shared cache. Written to a temp dir and renamed,
+    so a concurrent job with the same inputs never sees a half-written entry.
+    """
+    tmp_folder = tempfile.mkdtemp(dir=app.config['Result_FOLDER'])
+    try:
+        for name in RESULT_FILES:
+            shutil.copyfile(os.path.join(source_folder, name), os.path.join(tmp_folder, name))
+        os.rename(tmp_folder, cache_folder)
+    except OSError as e:
+        logging.warning(f"Could not cache results in {cache_folder}: {e}")
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+    evict_cached_results()
+
+def evict_cached_results():
+    """
+    Keeps only the RESULTS_CACHE_MAX_ENTRIES most recently used cache entries
+    (a hit refreshes the entry's mtime). In-progress temp dirs are left alone.
+    """
+    root = app.config['Result_FOLDER']
+    entries = []
+    for entry in os.scandir(root):
+        if entry.is_dir() and len(entry.name) == 40 and all(c in '0123456789abcdef' for c in entry.name):
+            entries.append((entry.stat().st_mtime, entry.path))
+    entries.sort(reverse=True)
+    for _, path in entries[RESULTS_CACHE_MAX_ENTRIES:]:
+        logging.info(f"Evicting cached results {path}")
+        shutil.rmtree(path, ignore_errors=True)
+
+def run_analysis(saved_files, session_folder):
+    """
+    Runs the full analysis for one upload and saves the results in its session folder.
+    Executed on ANALYSIS_EXECUTOR, outside the request thread.
+    """
+    # Re-analysis of an identical upload set is served from the results cache
+    cache_folder = os.path.join(app.config['Result_FOLDER'], fingerprint_files(saved_files))
+    if os.path.isdir(cache_folder):
+        try:
+            for name in RESULT_FILES:
+                shutil.copyfile(os.path.join(cache_folder, name), os.path.join(session_folder, name))
+            os.utime(cache_folder)  # Mark as recently used for eviction
+            logging.info(f"Using cached results from {cache_folder}")
+            return
+        except OSError as e:
+            # Evicted meanwhile: just analyze again
+            logging.warning(f"Could not read cached results in {cache_folder}: {e}")
+
+    # Load Data
+    dfs, date_columns = data_analyzer.load_data(saved_files)
+    
+    # Analyze
+    table_pks, relationships = data_analyzer.analyze_relationships(dfs)
+    
+    # Date Columns (detected while loading)
+    date_info = [None] * len(date_columns)
+    for idx, (name, d_cols) in enumerate(date_columns.items()):
+        date_info[idx] = {
+            "File Name": name,
+            "Date Columns": ", ".join(d_cols) if d_cols else "None"
+        }
+
+    # Save Intermediate Results
+    save_results(session_folder, table_pks, relationships, date_info)
+    cache_results(session_folder, cache_folder)
 
 
 
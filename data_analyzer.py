@@ -1,16 +1,84 @@
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
 import os
 import glob
 import logging
 import json
-from typing import List, Dict, Tuple, Any, Set
+import re
+import csv
+import pickle
+import multiprocessing
+from collections import defaultdict, Counter
+from functools import lru_cache
+from importlib.util import find_spec
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Dict, Tuple, Any, Optional, Union
 
 # ==============================================================================
 # CONSTANTS
 # ==============================================================================
 LOG_FILE = "analyzer_debug.log"
+RELATIONSHIP_COLUMNS = ["Child Table", "Child Column (FK)", "Parent Table", "Parent Column (PK)", "Cardinality"]
 SUPPORTED_EXTENSIONS = {'.csv', '.xlsx', '.xls', '.tsv', '.txt', '.json'}
 CHUNK_SIZE = 50000  # Process 50k rows at a time for large files
+MAX_UNIQUES = 2_000_000  # Distinct values tracked per non-key column before it is capped
+DTYPE_BACKEND = 'pyarrow'  # Arrow-backed columns: compact strings, faster unique()
+ARROW_BLOCK_SIZE = 8 << 20  # Bytes per block for the Arrow CSV reader (8 MB)
+PARALLEL_COLUMN_THRESHOLD = 8  # Only use a thread pool for tables wider than this
+MAX_LOAD_WORKERS = 8  # Files parsed concurrently by load_data (thread pool)
+PROCESS_POOL_MIN_BYTES = 64 * 1024 * 1024  # Use worker processes once an upload set is this large
+SNIFF_BYTES = 64 * 1024  # Head of a TXT file inspected to pick its separator
+SNIFF_DELIMITERS = ',\t;|'
+DENSE_KEY_RATIO = 4  # Integer keys spanning <= 4x their count use a presence table
+DATE_SAMPLE_SIZE = 32  # Values inspected by the cheap regex prefilter
+DATE_MATCH_RATIO = 0.8  # Share of sampled values that must look like dates
+
+DATE_PARSE_RATIO = 0.9  # Share of values that must parse with an inferred format
+
+# Common layouts with an explicit format: a sample that fully matches a pattern is parsed
+# with that format directly, skipping pandas' per-value format inference
+DATE_PATTERNS = [
+    (re.compile(r'^\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?(?:Z|[+-]\d{2}:?\d{2})?$'), ('ISO8601',)),
+    (re.compile(r'^\d{4}/\d{1,2}/\d{1,2}$'), ('%Y/%m/%d',)),
+    (re.compile(r'^\d{1,2}/\d{1,2}/\d{4}$'), ('%d/%m/%Y', '%m/%d/%Y')),
+    (re.compile(r'^\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}$'), ('%d/%m/%Y %H:%M', '%m/%d/%Y %H:%M')),
+    (re.compile(r'^\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}:\d{2}$'), ('%d/%m/%Y %H:%M:%S', '%m/%d/%Y %H:%M:%S')),
+    (re.compile(r'^\d{1,2}-\d{1,2}-\d{4}$'), ('%d-%m-%Y', '%m-%d-%Y')),
+    (re.compile(r'^\d{1,2}\.\d{1,2}\.\d{4}$'), ('%d.%m.%Y',)),
+    (re.compile(r'^\d{1,2}\.\d{1,2}\.\d{4} \d{1,2}:\d{2}(?::\d{2})?$'), ('%d.%m.%Y %H:%M', '%d.%m.%Y %H:%M:%S')),
+]
+
+# [CONFIG] Try pandas' generic date inference for values matching none of DATE_PATTERNS
+DATE_FALLBACK_PARSE = True
+
+# Cheap shape check run before the (much slower) generic datetime parse
+_DATE_RE = re.compile(
+    r'^\s*(?:'
+    r'\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}'             # 2023-01-31, 31/01/2023, 31.01.2023
+    r'|\d{8}T\d'                                    # ISO basic: 20230131T120000
+    r'|\d{1,2}[ -]?[A-Za-z]{3,9}\.?[ ,-]+\d{2,4}'   # 31 Jan 2023, 31-Jan-23
+    r'|[A-Za-z]{3,9}\.? \d{1,2},? \d{2,4}'          # Jan 31, 2023
+    r')'
+)
+
+# [CONFIG] Skip free-text columns of delimited files (by header name) so they are never
+# parsed or hashed. A name counts as free text when its last word matches (order_comment,
+# BodyText), and is still loaded if the relationship heuristics could match it (see _keep_column)
+SKIP_FREE_TEXT_COLUMNS = True
+FREE_TEXT_COLUMN_RE = re.compile(r'(?:description|comment|note|text|content|address|body)s?', re.IGNORECASE)
+_NAME_TOKEN_RE = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+')  # Words of snake_case/camelCase/spaced names
+
+# python-calamine reads Excel 5-20x faster than openpyxl; fall back to the pandas default without it
+EXCEL_ENGINE = 'calamine' if find_spec('python_calamine') else None
+try:
+    from python_calamine import CalamineError  # Raised for files calamine cannot open
+except ImportError:
+    CalamineError = ValueError  # Stand-in when calamine is not installed (already caught)
 
 # [CONFIG] Set your folder path here to avoid typing it every time.
 # Example: INPUT_DIRECTORY = r"C:\Users\MyName\Documents\Data"
@@ -21,21 +89,27 @@ class AnalyzedTable:
     """
     Optimized structure to hold table metadata and samples without memory overhead.
     """
+    __slots__ = ('name', 'row_count', 'columns', 'dtypes', 'uniques', 'pending_uniques', 'has_nulls',
+                 'unique_capped', 'pk_possible', 'sample_df')
+
     def __init__(self, name: str):
         self.name = name
         self.row_count = 0
         self.columns = []
         self.dtypes = {}        # col -> dtype
-        self.uniques: Dict[str, Set] = {}     # col -> set of unique values
+        self.uniques: Dict[str, Union[np.ndarray, pd.Index]] = {}  # col -> unique values (see merge_uniques)
+        self.pending_uniques = {}  # col -> per-chunk uniques not merged into uniques yet (while loading)
         self.has_nulls = {}     # col -> bool
+        self.unique_capped = {} # col -> bool (non-PK uniques dropped after exceeding MAX_UNIQUES)
+        self.pk_possible = {}   # col -> False once a null or duplicate rules it out as a PK
         self.sample_df = None   # For type inference (head)
 
     def is_col_unique(self, col: str) -> bool:
         """Checks if a column is a primary key candidate (Unique & No Nulls)."""
-        if self.has_nulls.get(col, True):
+        if self.has_nulls.get(col, True) or not self.pk_possible.get(col, True):
             return False
         # If unique count == row count, it's unique
-        return len(self.uniques.get(col, set())) == self.row_count
+        return len(self.uniques.get(col, ())) == self.row_count
 
 
 def validate_file_extension(file_path: str):
@@ -47,76 +121,433 @@ def validate_file_extension(file_path: str):
     if ext.lower() not in SUPPORTED_EXTENSIONS:
         raise ValueError(f"File format '{ext}' is not supported. Please upload a file with one of these extensions: {', '.join(sorted(SUPPORTED_EXTENSIONS))}")
 
-def load_data(file_paths: List[str]) -> Dict[str, AnalyzedTable]:
+def sorted_unique(values: np.ndarray) -> np.ndarray:
+    """np.unique by sort + neighbour compare; much faster than numpy's hash-based unique here."""
+    values = np.sort(values)
+    if len(values) < 2: return values
+    keep = np.empty(len(values), dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+def chunk_uniques_part(chunk_uniques) -> Union[np.ndarray, pd.Index]:
     """
-    Loads data files into AnalyzedTable objects using chunking for efficiency.
+    Turns a chunk's distinct (non-null) values into a part for merge_uniques: a sorted
+    numpy array for numeric values, a pd.Index in its native dtype otherwise.
     """
-    tables = {}
+    if chunk_uniques.dtype.kind in 'iuf':
+        return np.sort(np.asarray(chunk_uniques))  # Already distinct
+    return pd.Index(chunk_uniques)
+
+def merge_uniques(parts: List[Union[np.ndarray, pd.Index]]) -> Union[np.ndarray, pd.Index]:
+    """
+    Merges buffered parts (see chunk_uniques_part) into one set of uniques.
+    All-numeric parts give one sorted numpy array (no boxing, and min/max are its ends);
+    anything else a pd.Index in its native dtype.
+    """
+    if len(parts) == 1: return parts[0]
+    if all(isinstance(part, np.ndarray) for part in parts):
+        return sorted_unique(np.concatenate(parts))
+    # One concatenation and one hash pass over all parts, not a union per part
+    return pd.Index(parts[0]).append([pd.Index(part) for part in parts[1:]]).unique()
+
+def read_excel(path: str, **kwargs) -> pd.DataFrame:
+    """
+    Reads an Excel file, preferring the (much faster) calamine engine when it is installed.
+    Extra keyword arguments are passed on to pd.read_excel.
+    """
+    kwargs.setdefault('dtype_backend', DTYPE_BACKEND)
+    if EXCEL_ENGINE:
+        try:
+            return pd.read_excel(path, engine=EXCEL_ENGINE, **kwargs)
+        except (ImportError, ValueError, CalamineError) as e:
+            logging.warning(f"Excel engine '{EXCEL_ENGINE}' failed for {os.path.basename(path)}, using default: {e}")
+    return pd.read_excel(path, **kwargs)
+
+def _looks_like_fk(col: str) -> bool:
+    """Name heuristic for columns that may take part in a key relationship."""
+    col_lower = str(col).lower()
+    return col_lower == 'id' or col_lower.endswith('_id') or '_fk' in col_lower
+
+def simplify_table_name(name: str) -> str:
+    """Table name as the relationship name heuristic compares it."""
+    return os.path.splitext(name)[0].lower().replace("s", "")
+
+def _keep_column(col: str, other_names: set, other_tables: List[str]) -> bool:
+    """
+    Whether a delimited column is loaded: everything but free text, and free text too when
+    the heuristics in analyze_relationships could match it, i.e. an FK-like name, a name
+    found in another file (other_names, lowercased) or one containing another table's
+    simplified name.
+
+    >>> _keep_column('AddressNumber', set(), [])
+    True
+    >>> _keep_column('DeliveryNote', set(), ['delivery'])
+    True
+    >>> _keep_column('DeliveryNote', {'deliverynote'}, [])
+    True
+    >>> _keep_column('delivery_note_date', set(), [])
+    True
+    >>> _keep_column('order_comment', set(), ['delivery'])
+    False
+    """
+    tokens = _NAME_TOKEN_RE.findall(str(col))
+    if not tokens or FREE_TEXT_COLUMN_RE.fullmatch(tokens[-1]) is None:
+        return True
+    col_lower = str(col).lower()
+    return (_looks_like_fk(col) or col_lower in other_names
+            or any(table in col_lower for table in other_tables))
+
+def plan_loads(file_paths: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Prepares the load of every file from its header alone. Per file: the separator ("sep")
+    and header ("header") of delimited files, read here once and reused by _load_one, and the
+    columns to load ("usecols", see _keep_column). None means not known yet / every column.
+    """
+    plan = {path: {"sep": None, "header": None, "usecols": None} for path in file_paths}
+    delimited = [path for path in file_paths if path.endswith(('.csv', '.txt', '.tsv'))]
+    for path in delimited:
+        try:
+            plan[path]["sep"] = delimiter_for(path)
+        except OSError:
+            pass  # _load_one reports the unreadable file
+    # Only delimited files have columns to skip; don't parse any header without one
+    if not SKIP_FREE_TEXT_COLUMNS or not delimited: return plan
+
+    headers = {}
     for path in file_paths:
-        filename = os.path.basename(path)
         try:
-            validate_file_extension(path)
-            table = AnalyzedTable(filename)
-            
-            # Helper to process a DataFrame chunk
-            def process_df(df_chunk, is_first_chunk):
-                if is_first_chunk:
-                    table.sample_df = df_chunk.head(1000) # Keep a sample
-                    table.columns = df_chunk.columns.tolist()
-                    table.dtypes = df_chunk.dtypes.to_dict()
-                
-                table.row_count += len(df_chunk)
-                
-                for col in df_chunk.columns:
-                    # Drop NaNs for unique set
-                    valid_vals = df_chunk[col].dropna()
-                    if len(valid_vals) < len(df_chunk[col]):
-                        table.has_nulls[col] = True
-                    else:
-                        if col not in table.has_nulls: table.has_nulls[col] = False # Initialize
+            headers[path] = read_header(path, plan[path]["sep"])
+        except Exception:
+            headers[path] = None
+        # Names of a file we can't preview could match anything, so keep every column
+        if headers[path] is None: return plan
+        if path in delimited: plan[path]["header"] = headers[path]
+
+    name_counts = Counter(name for header in headers.values() for name in {str(c).lower() for c in header})
+    for path in delimited:
+        header = headers[path]
+        own_names = {str(c).lower() for c in header}
+        # Names this file shares with some other file (possible FK/PK name matches)
+        other_names = {name for name in own_names if name_counts[name] > 1}
+        other_tables = [simplify_table_name(os.path.basename(p)) for p in file_paths if p != path]
+        keep = [c for c in header if _keep_column(c, other_names, other_tables)]
+        if keep and len(keep) < len(header):
+            plan[path]["usecols"] = keep
+            logging.info(f"{os.path.basename(path)}: skipping free-text columns {[c for c in header if c not in keep]}")
+    return plan
+
+def read_csv_arrow(path: str, sep: str, on_chunk, usecols: Optional[List[str]] = None,
+                   header: Optional[List[str]] = None) -> None:
+    """
+    Streams a delimited file through pyarrow's CSV reader, handing each block to
+    on_chunk(df_chunk, is_first_chunk) as an Arrow-backed DataFrame.
+    Only usecols are converted when given; header is the file's read_header, if already known.
+    Raises pyarrow.ArrowException if the file can't be parsed this way.
+    """
+    # Arrow keeps duplicate header names, which breaks column access later on; take the
+    # header as pandas names it (id, id.1, Unnamed: 2) so both readers agree
+    column_names = header if header is not None else read_header(path, sep)
+    read_options = pacsv.ReadOptions(block_size=ARROW_BLOCK_SIZE, column_names=column_names, skip_rows=1)
+    parse_options = pacsv.ParseOptions(delimiter=sep)
+
+    def _open(column_types=None):
+        return pacsv.open_csv(path, read_options=read_options, parse_options=parse_options,
+                              convert_options=pacsv.ConvertOptions(strings_can_be_null=True, include_columns=usecols or [],
+                                                                   column_types=column_types or {}))
+
+    reader = _open()
+    # Arrow infers integers beyond the int64 range as double, which collapses distinct IDs;
+    # probe the raw tokens of inferred float columns and read all-integer ones as text
+    float_cols = [field.name for field in reader.schema if pa.types.is_floating(field.type)]
+    if float_cols:
+        probe = pacsv.open_csv(path, read_options=read_options, parse_options=parse_options,
+                               convert_options=pacsv.ConvertOptions(strings_can_be_null=True, include_columns=float_cols,
+                                                                    column_types={c: pa.string() for c in float_cols}))
+        batch = probe.read_next_batch()
+        big_int_cols = [c for c in float_cols
+                        if pc.all(pc.match_substring_regex(batch.column(c), r'^\s*[+-]?\d+\s*$'), skip_nulls=True).as_py() is not False]
+        if big_int_cols:
+            logging.info(f"{os.path.basename(path)}: integers beyond int64 in {big_int_cols}, read as text")
+            reader = _open({c: pa.string() for c in big_int_cols})
+
+    first = True
+    for batch in reader:
+        on_chunk(batch.to_pandas(types_mapper=pd.ArrowDtype), first)
+        first = False
+    if first:
+        # Header-only file: still record its columns
+        on_chunk(reader.schema.empty_table().to_pandas(types_mapper=pd.ArrowDtype), True)
+
+def overflowing_int_columns(path: str, sep: str, usecols: Optional[List[str]] = None) -> List[str]:
+    """
+    Columns of a delimited file holding integers beyond int64. The numpy-backed parser keeps
+    those as Python ints (object); Arrow-backed reads raise OverflowError on them.
+    """
+    cols = []
+    with pd.read_csv(path, sep=sep, usecols=usecols, chunksize=CHUNK_SIZE) as reader:
+        for chunk in reader:
+            for col in chunk.columns:
+                if col not in cols and chunk[col].dtype == object and pd.api.types.infer_dtype(chunk[col], skipna=True) == 'integer':
+                    cols.append(col)
+    return cols
+
+def delimiter_for(path: str) -> str:
+    """Separator of a delimited file: by extension, sniffed for TXT."""
+    if path.endswith('.tsv'): return '\t'
+    if path.endswith('.txt'):
+        # Sniff once up front so TXT gets the fast parsers too; no delimiter
+        # found means a single-column file
+        return sniff_separator(path) or ','
+    return ','
+
+def read_header(path: str, sep: Optional[str] = None) -> Optional[List[str]]:
+    """
+    Column names of a delimited or Excel file, read without its rows.
+    Delimited files are read with sep, or their delimiter_for when not given.
+    Returns None for formats without a cheap header read (JSON).
+    """
+    if path.endswith(('.csv', '.txt', '.tsv')):
+        return pd.read_csv(path, sep=sep or delimiter_for(path), nrows=0).columns.tolist()
+    if path.endswith(('.xls', '.xlsx')):
+        return read_excel(path, nrows=0).columns.tolist()
+    return None
 
-                    unique_updates = set(valid_vals.unique())
-                    if col not in table.uniques:
-                        table.uniques[col] = unique_updates
-                    else:
-                        table.uniques[col].update(unique_updates)
+def sniff_separator(path: str) -> Optional[str]:
+    """
+    Guesses the separator of a delimited text file from its first SNIFF_BYTES.
+    Returns None if no consistent separator is found.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES).decode('utf-8', errors='replace')
+    # Drop the trailing partial line so it can't skew the delimiter counts
+    if len(head) >= SNIFF_BYTES and '\n' in head:
+        head = head[:head.rindex('\n')]
+    try:
+        return csv.Sniffer().sniff(head, delimiters=SNIFF_DELIMITERS).delimiter
+    except csv.Error:
+        return None
 
-            # Loading Strategy based on file type
-            if path.endswith(('.csv', '.txt', '.tsv')):
-                # CHUNKED LOADING
-                sep = '\t' if path.endswith('.tsv') else ','
-                if path.endswith('.txt'): sep = None # Sniffer or python engine
-                
-                engine = 'python' if path.endswith('.txt') else 'c'
+def _load_one(path: str, plan: Optional[Dict[str, Any]] = None) -> Optional[Tuple[AnalyzedTable, List[str]]]:
+    """
+    Loads a single data file into an AnalyzedTable and detects its date columns.
+    Delimited files reuse the separator and header of their plan and load only its
+    usecols when given (see plan_loads).
+    Returns None if the file can't be loaded.
+    """
+    filename = os.path.basename(path)
+    plan = plan or {}
+    usecols = plan.get("usecols")
+    try:
+        validate_file_extension(path)
+        table = AnalyzedTable(filename)
+        date_cols = []
+        
+        def merge_pending(col):
+            """Folds a column's buffered chunk uniques into its uniques and re-checks it."""
+            parts = table.pending_uniques.pop(col)
+            if col in table.uniques: parts.insert(0, table.uniques[col])
+            table.uniques[col] = merge_uniques(parts)
+
+            # Repeats across chunks show up here: fewer distinct values than rows
+            if table.pk_possible.get(col, True) and len(table.uniques[col]) < table.row_count:
+                table.pk_possible[col] = False
+
+            # Unbounded cardinality in a column already ruled out as PK (free text etc.):
+            # stop tracking it, it is then skipped as FK child. PK candidates are never capped,
+            # their uniques are what FK checks against large tables probe.
+            if not table.pk_possible.get(col, True) and len(table.uniques[col]) > MAX_UNIQUES:
+                table.unique_capped[col] = True
+                del table.uniques[col]
+                logging.warning(f"{table.name}.{col}: more than {MAX_UNIQUES} distinct values, excluded from FK detection.")
+
+        # Helper to process a DataFrame chunk
+        def process_df(df_chunk, is_first_chunk):
+            nonlocal date_cols
+            if is_first_chunk:
+                table.sample_df = df_chunk.head(1000) # Keep a sample
+                table.columns = df_chunk.columns.tolist()
+                table.dtypes = df_chunk.dtypes.to_dict()
+                # Probe dates now, while the sample is still hot in cache
+                date_cols = detect_date_columns(table)
+            
+            table.row_count += len(df_chunk)
+
+            # One vectorized null scan for all columns of the chunk
+            chunk_has_nulls = df_chunk.isna().any()
+            
+            for col in df_chunk.columns:
+                col_has_nulls = chunk_has_nulls[col]
+                if col_has_nulls:
+                    table.has_nulls[col] = True
+                elif col not in table.has_nulls:
+                    table.has_nulls[col] = False # Initialize
+
+                if table.unique_capped.get(col): continue
+
+                # Single pass over the column: take its distinct values, then drop nulls from
+                # that (small) result instead of copying the whole column through dropna()
+                unique_vals = df_chunk[col].unique()
+                if col_has_nulls:
+                    unique_vals = unique_vals[~pd.isna(unique_vals)]
+
+                part = chunk_uniques_part(unique_vals)
+
+                # Exact early PK rejection: a null, or a value repeated within the chunk, rules
+                # the column out for good; its uniques stay, optional FKs need them
+                if table.pk_possible.get(col, True) and (col_has_nulls or len(part) < len(df_chunk)):
+                    table.pk_possible[col] = False
+
+                # Buffer the chunk's uniques and merge only once the buffer outgrows the merged
+                # set, so every value is merged O(log n) times instead of once per chunk
+                pending = table.pending_uniques.setdefault(col, [])
+                pending.append(part)
+                if sum(map(len, pending)) >= len(table.uniques.get(col, ())):
+                    merge_pending(col)
+
+        # Loading Strategy based on file type
+        if path.endswith(('.csv', '.txt', '.tsv')):
+            # CHUNKED LOADING
+            sep = plan.get("sep") or delimiter_for(path)
+            loaded = False
+            # Arrow's multithreaded reader
+            try:
+                read_csv_arrow(path, sep, process_df, usecols, plan.get("header"))
+                loaded = True
+            except pa.ArrowException as e:
+                # Arrow fixes column types from the first block; later blocks may disagree
+                logging.warning(f"Arrow CSV reader failed for {filename}, using pandas: {e}")
+                table = AnalyzedTable(filename)  # Discard partially processed blocks
+
+            def read_with_pandas(dtype=None):
+                nonlocal table
                 # Use iterator
                 try:
-                    with pd.read_csv(path, sep=sep, chunksize=CHUNK_SIZE, engine=engine) as reader:
+                    with pd.read_csv(path, sep=sep, usecols=usecols, dtype=dtype, chunksize=CHUNK_SIZE, dtype_backend=DTYPE_BACKEND) as reader:
                         first = True
                         for chunk in reader:
                             process_df(chunk, first)
                             first = False
+                except OverflowError:
+                    raise
                 except Exception as e:
-                     # Fallback for small TXT files that might fail chunking or separator issues
+                     # Fallback for small files that might fail chunking or separator issues
                      logging.warning(f"Chunking failed for {filename}, trying full load: {e}")
-                     df = pd.read_csv(path, sep=sep, engine=engine)
+                     table = AnalyzedTable(filename)  # Discard partially processed chunks
+                     df = pd.read_csv(path, sep=sep, usecols=usecols, dtype=dtype, dtype_backend=DTYPE_BACKEND)
                      process_df(df, True)
 
-            elif path.endswith('.json'):
-                df = pd.read_json(path)
-                process_df(df, True)
+            if not loaded:
+                try:
+                    read_with_pandas()
+                except OverflowError:
+                    # Arrow-backed pandas columns can't hold integers beyond int64; read those
+                    # columns as text, as the Arrow path does
+                    table = AnalyzedTable(filename)
+                    text_cols = overflowing_int_columns(path, sep, usecols)
+                    logging.warning(f"{filename}: integers beyond int64 in {text_cols}, read as text")
+                    read_with_pandas({c: pd.ArrowDtype(pa.string()) for c in text_cols})
+
+        elif path.endswith('.json'):
+            df = pd.read_json(path, dtype_backend=DTYPE_BACKEND)
+            process_df(df, True)
+
+        elif path.endswith(('.xls', '.xlsx')):
+            df = read_excel(path)
+            process_df(df, True)
+        
+        for col in list(table.pending_uniques):
+            merge_pending(col)
 
-            elif path.endswith(('.xls', '.xlsx')):
-                df = pd.read_excel(path)
-                process_df(df, True)
-            
-            tables[filename] = table
-            logging.info(f"Loaded {filename}: {table.row_count} rows processed.")
+        logging.info(f"Loaded {filename}: {table.row_count} rows processed.")
+        return table, date_cols
 
-        except Exception as e:
-            logging.error(f"Failed loading {filename}: {e}", exc_info=True)
-            # Skip file on error
+    except Exception as e:
+        logging.error(f"Failed loading {filename}: {e}", exc_info=True)
+        return None  # Skip file on error
+
+def config_snapshot() -> Dict[str, Any]:
+    """The module's current configuration constants (every upper-case global), overrides included."""
+    return {name: value for name, value in globals().items() if name.isupper()}
+
+def _init_load_worker(log_queue, config: Dict[str, Any]) -> None:
+    """
+    Applies the parent's configuration to a worker process (spawn re-imports this module
+    with the defaults) and routes its log records back to the parent's handlers.
+    """
+    globals().update(config)
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(log_queue)]
+    root.setLevel(logging.DEBUG)
+
+def _load_in_processes(file_paths: List[str], plans: List[Dict[str, Any]]) -> List[Optional[Tuple[AnalyzedTable, List[str]]]]:
+    """
+    Loads files in a process pool (one file per task), so the Python-level chunk work
+    runs on all cores instead of contending for the GIL.
+    """
+    ctx = multiprocessing.get_context('spawn')  # Safe to start from Flask's worker threads
+    log_queue = ctx.Queue()
+    listener = QueueListener(log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+    listener.start()
+    try:
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(file_paths)), mp_context=ctx,
+                                 initializer=_init_load_worker, initargs=(log_queue, config_snapshot())) as executor:
+            return list(executor.map(_load_one, file_paths, plans))
+    finally:
+        listener.stop()
+
+def load_data(file_paths: List[str]) -> Tuple[Dict[str, AnalyzedTable], Dict[str, List[str]]]:
+    """
+    Loads data files into AnalyzedTable objects using chunking for efficiency.
+    Large multi-file sets are parsed in worker processes, small ones in threads.
+    Returns the tables and the date columns detected for each of them.
+    """
+    tables = {}
+    date_columns = {}
+    if not file_paths: return tables, date_columns
+
+    plan = plan_loads(file_paths)
+    plans = [plan[p] for p in file_paths]
+
+    results = None
+    total_bytes = sum(os.path.getsize(p) for p in file_paths if os.path.isfile(p))
+    if len(file_paths) > 1 and total_bytes >= PROCESS_POOL_MIN_BYTES:
+        try:
+            results = _load_in_processes(file_paths, plans)
+        except (pickle.PicklingError, BrokenProcessPool, OSError) as e:
+            logging.warning(f"Process pool loading failed, loading in threads instead: {e}")
+
+    if results is None:
+        # Small inputs: process start-up would cost more than it saves
+        with ThreadPoolExecutor(max_workers=min(MAX_LOAD_WORKERS, len(file_paths))) as executor:
+            results = list(executor.map(_load_one, file_paths, plans))
+
+    for result in results:
+        if result is not None:
+            table, date_cols = result
+            tables[table.name] = table
+            date_columns[table.name] = date_cols
             
-    return tables
+    return tables, date_columns
+
+
+# Dtype predicates, memoized: a run only sees a handful of distinct dtypes but asks
+# about them once per column of every table
+@lru_cache(maxsize=64)
+def _is_numeric(dtype) -> bool:
+    return pd.api.types.is_numeric_dtype(dtype)
+
+@lru_cache(maxsize=64)
+def _is_float(dtype) -> bool:
+    return pd.api.types.is_float_dtype(dtype)
+
+@lru_cache(maxsize=64)
+def _is_bool(dtype) -> bool:
+    return pd.api.types.is_bool_dtype(dtype)
+
+@lru_cache(maxsize=64)
+def _is_datetime(dtype) -> bool:
+    return pd.api.types.is_datetime64_any_dtype(dtype)
 
 
 def detect_primary_keys(table: AnalyzedTable) -> List[str]:
@@ -125,6 +556,9 @@ def detect_primary_keys(table: AnalyzedTable) -> List[str]:
     """
     pk_candidates = []
     for col in table.columns:
+        # PKs are practically never floating point, so skip those before checking cardinality
+        if _is_float(table.dtypes.get(col)):
+            continue
         if table.is_col_unique(col):
             pk_candidates.append(col)
     return pk_candidates
@@ -133,27 +567,127 @@ def detect_date_columns(table: AnalyzedTable) -> List[str]:
     """
     Identifies columns that look like dates using the sample.
     """
-    date_cols = []
     df = table.sample_df
     if df is None or df.empty: return []
 
-    for col in table.columns:
-        if col not in df.columns: continue
+    def _try_date(col: str) -> Optional[str]:
+        if col not in df.columns: return None
+
+        # Already parsed as datetimes by the reader (e.g. Excel): nothing to re-parse
+        dtype = df[col].dtype
+        if _is_datetime(dtype):
+            return col
         
         # Optimization: Skip likely numeric/bool columns
-        if pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col]):
-             continue
+        if _is_numeric(dtype) or _is_bool(dtype):
+             return None
+
+        sample = df[col].dropna().astype(str).head(DATE_SAMPLE_SIZE)
+        if sample.empty: return None
+
+        # Stage 1: infer a concrete format from the sample, then parse with it
+        for pattern, formats in DATE_PATTERNS:
+            if not sample.str.match(pattern).all(): continue
+            valid_count = df[col].notna().sum()
+            for fmt in formats:
+                parsed = pd.to_datetime(df[col], errors='coerce', format=fmt)
+                if parsed.notna().sum() >= DATE_PARSE_RATIO * valid_count:
+                    return col
+
+        # Stage 2 (opt-in): generic inference, only if most sampled values look like dates
+        if not DATE_FALLBACK_PARSE: return None
+        if sample.str.match(_DATE_RE).mean() < DATE_MATCH_RATIO:
+            return None
              
-        try:
-            pd.to_datetime(df[col], errors='raise')
-            date_cols.append(col)
-        except (ValueError, TypeError):
-            continue
-    return date_cols
+        # ISO 8601 has a fast vectorized parser; only other layouts need per-value inference
+        for fmt in ('ISO8601', 'mixed'):
+            try:
+                pd.to_datetime(df[col], errors='raise', format=fmt)
+                return col
+            except (ValueError, TypeError):
+                continue
+        return None
+
+    # Columns are independent, so wide tables are probed in parallel (the parser releases the GIL)
+    if len(table.columns) > PARALLEL_COLUMN_THRESHOLD:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            results = list(executor.map(_try_date, table.columns))
+    else:
+        results = [_try_date(col) for col in table.columns]
+
+    return [col for col in results if col is not None]
+
+def is_subset_int(child: np.ndarray, parent_sorted: np.ndarray) -> bool:
+    """
+    Checks child ⊆ parent for integer arrays by binary-searching a sorted parent (no hashing).
+    """
+    if not len(parent_sorted): return not len(child)
+    pos = np.searchsorted(parent_sorted, child)
+    np.minimum(pos, len(parent_sorted) - 1, out=pos)
+    return bool((parent_sorted[pos] == child).all())
 
-def analyze_relationships(tables: Dict[str, AnalyzedTable]):
+def is_subset_int_dense(child: np.ndarray, lookup: np.ndarray, base: int) -> bool:
+    """
+    Checks child ⊆ parent for integer arrays using a presence table over the parent's
+    (dense) value range: a single vectorized gather, no hashing or searching.
+    """
+    if not len(child): return True
+    offsets = child - base
+    if offsets.min() < 0 or offsets.max() >= len(lookup): return False
+    return bool(lookup[offsets].all())
+
+def build_column_info(tables: Dict[str, AnalyzedTable]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Computes a per-column signature (unique values, cardinality, dtype, range) for every table.
+    """
+    col_info = {}
+    for name, table in tables.items():
+        for col in table.columns:
+            stored = table.uniques.get(col)
+            presorted = isinstance(stored, np.ndarray)  # Numeric uniques are kept sorted
+            uniq = pd.Index(stored if stored is not None else [])
+            dtype = table.dtypes.get(col)
+            is_numeric = _is_numeric(dtype)
+
+            # Value envelope: ends of the sorted numeric uniques, or lexicographic range
+            # for pure-string columns
+            col_min = col_max = None
+            if presorted and is_numeric and len(stored):
+                col_min, col_max = stored[0], stored[-1]
+            elif not is_numeric and len(uniq) and pd.api.types.infer_dtype(uniq, skipna=True) == "string":
+                col_min, col_max = uniq.min(), uniq.max()
+
+            is_unique = table.is_col_unique(col)
+
+            # Integer PK candidates get a presence table (dense ranges) or a sorted copy
+            # for the integer subset kernels
+            sorted_vals = lookup = None
+            if is_unique and uniq.dtype.kind in 'iu' and col_min is not None:
+                values = uniq.to_numpy()
+                value_range = int(col_max) - int(col_min) + 1
+                if value_range <= DENSE_KEY_RATIO * len(values):
+                    lookup = np.zeros(value_range, dtype=bool)
+                    lookup[values - col_min] = True
+                else:
+                    sorted_vals = stored if presorted else np.sort(values)
+
+            col_info[(name, col)] = {
+                "uniq": uniq,
+                "sorted": sorted_vals,
+                "lookup": lookup,
+                "is_unique": is_unique,
+                "nunique": len(uniq),
+                "dtype": dtype,
+                "is_numeric": is_numeric,
+                "min": col_min,
+                "max": col_max,
+            }
+    return col_info
+
+def analyze_relationships(tables: Dict[str, AnalyzedTable]) -> Tuple[Dict[str, List[str]], pd.DataFrame]:
     """
     Core Logic: Inter-table relationship inference.
+    Returns the PK candidates per table and a DataFrame of relationships (RELATIONSHIP_COLUMNS).
     """
     # Step 1: Detect PKs
     logging.info("Detecting Primary Keys...")
@@ -166,70 +700,95 @@ def analyze_relationships(tables: Dict[str, AnalyzedTable]):
         else:
              logging.info(f"Table '{name}': No PK candidates found.")
 
-    relationships = []
+    # Step 2: Summarize every column once, outside the O(T^2) pair loop
+    col_info = build_column_info(tables)
+
+    # Results are collected column-wise (one list per output column) and framed at the end
+    rel_child, rel_fk, rel_parent, rel_pk, rel_card = [], [], [], [], []
     
     files = list(tables.keys())
     logging.info(f"Analyzing {len(files)} files for relationships...")
+
+    # Inverted name index: which parent keys can name-match a child column. Entries are
+    # (parent position, pk position) so candidates can be visited in file/key order.
+    # Every index is split by is_numeric, so a child column only ever sees type-compatible keys.
+    pk_by_name = defaultdict(list)   # (lowercased pk, is_numeric) -> keys
+    pk_by_table = {False: defaultdict(list), True: defaultdict(list)}  # is_numeric -> simplified table name -> keys
+    id_pks = {False: [], True: []}   # is_numeric -> keys named "id" (matched by any "*_id" column)
+    parent_keys = {}                 # (parent position, pk position) -> (parent_file, pk)
+    for j, parent_file in enumerate(files):
+        parent_table_simple = simplify_table_name(parent_file)
+        for k, pk in enumerate(table_pks[parent_file]):
+            pk_lower = str(pk).lower()
+            is_numeric = col_info[(parent_file, pk)]["is_numeric"]
+            parent_keys[(j, k)] = (parent_file, pk)
+            pk_by_name[(pk_lower, is_numeric)].append((j, k))
+            pk_by_table[is_numeric][parent_table_simple].append((j, k))
+            if pk_lower == "id": id_pks[is_numeric].append((j, k))
     
     for i, child_file in enumerate(files):
-        child_table = tables[child_file]
-        
-        for j, parent_file in enumerate(files):
-            if i == j: continue
-            
-            parent_table = tables[parent_file]
-            parent_pks = table_pks[parent_file]
-            
-            for pk in parent_pks:
-                for col in child_table.columns:
-                    try:
-                        child_vals = child_table.uniques.get(col, set())
-                        parent_vals = parent_table.uniques.get(pk, set())
-                        
-                        if not child_vals: continue
-
-                        # --- Heuristic Name Check ---
-                        parent_table_simple = os.path.splitext(parent_file)[0].lower().replace("s", "")
-                        child_col_lower = col.lower()
-                        pk_lower = pk.lower()
-                        
-                        is_name_match = (
-                            child_col_lower == pk_lower or 
-                            parent_table_simple in child_col_lower or
-                            (pk_lower == "id" and child_col_lower.endswith("_id"))
-                        )
-                        
-                        if not is_name_match: continue
-                        
-                        # --- Heuristic Data Type Check ---
-                        child_dtype = child_table.dtypes.get(col)
-                        parent_dtype = parent_table.dtypes.get(pk)
-                        
-                        is_child_numeric = pd.api.types.is_numeric_dtype(child_dtype)
-                        is_parent_numeric = pd.api.types.is_numeric_dtype(parent_dtype)
-                        
-                        if is_child_numeric != is_parent_numeric: continue
-                        
-                        # --- Subset Check ---
-                        if child_vals.issubset(parent_vals):
-                            # Cardinality
-                            if child_table.is_col_unique(col):
-                                cardinality = "1:1"
-                            else:
-                                cardinality = "n:1"
-                            
-                            relationships.append({
-                                "Child Table": child_file,
-                                "Child Column (FK)": col,
-                                "Parent Table": parent_file,
-                                "Parent Column (PK)": pk,
-                                "Cardinality": cardinality
-                            })
-                            logging.debug(f"Found {cardinality} relation: {child_file}.{col} -> {parent_file}.{pk}")
-                    except Exception as e:
-                        logging.warning(f"Error checking {child_file}.{col}: {e}")
+        # --- Heuristic Name Check ---
+        # Look up matching parent keys per column instead of scanning every (parent, pk) pair
+        candidates = []
+        for c, col in enumerate(tables[child_file].columns):
+            child_col_lower = str(col).lower()
+            # --- Heuristic Data Type Check (via the split index) ---
+            is_numeric = col_info[(child_file, col)]["is_numeric"]
+            matched = set(pk_by_name.get((child_col_lower, is_numeric), ()))
+            for parent_table_simple, keys in pk_by_table[is_numeric].items():
+                if parent_table_simple in child_col_lower: matched.update(keys)
+            if child_col_lower.endswith("_id"): matched.update(id_pks[is_numeric])
+            candidates.extend((j, k, c, col) for j, k in matched if j != i)
+        candidates.sort(key=lambda cand: cand[:3])
+
+        for j, k, _, col in candidates:
+            parent_file, pk = parent_keys[(j, k)]
+            parent_info = col_info[(parent_file, pk)]
+            try:
+                child_info = col_info[(child_file, col)]
+                
+                if not child_info["nunique"]: continue
+
+                # --- Cheap Signature Filters (a subset can't be larger or exceed the range) ---
+                # These reject most pairs without hashing a single value.
+                if child_info["nunique"] > parent_info["nunique"]: continue
+                if child_info["min"] is not None and parent_info["min"] is not None:
+                    if child_info["min"] < parent_info["min"] or child_info["max"] > parent_info["max"]:
                         continue
+                
+                # --- Subset Check ---
+                child_uniq = child_info["uniq"]
+                is_child_int = child_uniq.dtype.kind in 'iu'
+                if parent_info["lookup"] is not None and is_child_int:
+                    is_subset = is_subset_int_dense(child_uniq.to_numpy(), parent_info["lookup"], parent_info["min"])
+                elif parent_info["sorted"] is not None and is_child_int:
+                    is_subset = is_subset_int(child_uniq.to_numpy(), parent_info["sorted"])
+                else:
+                    # isin() hashes its argument, so hash the (smaller) child side and probe
+                    # the parent; both sides are unique, so a full count means child ⊆ parent.
+                    is_subset = parent_info["uniq"].isin(child_uniq).sum() == len(child_uniq)
+
+                if is_subset:
+                    # Cardinality
+                    if child_info["is_unique"]:
+                        cardinality = "1:1"
+                    else:
+                        cardinality = "n:1"
+                    
+                    rel_child.append(child_file)
+                    rel_fk.append(col)
+                    rel_parent.append(parent_file)
+                    rel_pk.append(pk)
+                    rel_card.append(cardinality)
+                    logging.debug(f"Found {cardinality} relation: {child_file}.{col} -> {parent_file}.{pk}")
+            except Exception as e:
+                logging.warning(f"Error checking {child_file}.{col}: {e}")
+                continue
     
+    relationships = pd.DataFrame(
+        dict(zip(RELATIONSHIP_COLUMNS, (rel_child, rel_fk, rel_parent, rel_pk, rel_card))),
+        columns=RELATIONSHIP_COLUMNS
+    )
     logging.info(f"Relationship analysis complete. Found {len(relationships)} relationships.")
     return table_pks, relationships
 
@@ -278,7 +837,7 @@ def main():
         logging.info(f"Found {len(compatible_files)} compatible files.")
         
         # Load Data (Optimized)
-        tables = load_data(compatible_files)
+        tables, date_columns = load_data(compatible_files)
         if not tables:
             logging.error("No data could be loaded.")
             return
@@ -286,14 +845,13 @@ def main():
         # Analyze
         table_pks, relationships = analyze_relationships(tables)
         
-        # Detect Dates
-        date_info = []
-        for name, table in tables.items():
-            d_cols = detect_date_columns(table)
-            date_info.append({
+        # Dates (detected while loading)
+        date_info = [None] * len(tables)
+        for idx, (name, d_cols) in enumerate(date_columns.items()):
+            date_info[idx] = {
                 "File Name": name,
                 "Date Columns": ", ".join(d_cols) if d_cols else "None"
-            })
+            }
 
         logging.info("Analysis complete.")
         print("[SUCCESS] Analysis complete! Check the console logs for details.")